@@ -1,96 +1,439 @@
 import os
+import re
+import asyncio
 import subprocess
 from pathlib import Path
-import re
 import json
+import functools
+from typing import NamedTuple, Optional
+import collections
+import csv
+import itertools
+import shutil
+import tempfile
 from tqdm import tqdm
 
 # --- 인코딩 기본 설정 변수 ---
 DEFAULT_CRF_VALUE = 20
-DEFAULT_PRESET = "medium" 
+DEFAULT_PRESET = "faster" # medium 대비 인코딩 시간을 크게 줄이면서 화질 차이는 미미함
+X265_PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow", "placebo"]
 NVENC_CQP_VALUE = 23 # CRF 20과 유사한 NVENC CQP 값 (테스트 필요)
-NVENC_PRESET = "medium" # NVENC용 프리셋
+NVENC_PRESET = "p4" # NVENC용 프리셋 (p1: 가장 빠름 ~ p7: 가장 높은 품질)
+NVENC_TUNE = "hq" # NVENC 튜닝 (hq, uhq, ll, ull)
+NVENC_PRESETS = [f"p{i}" for i in range(1, 8)]
+NVENC_TUNES = ["hq", "uhq", "ll", "ull"]
+# B-프레임(참조 포함) 옵션: HEVC B-프레임을 지원하는 GPU(Turing 이후)에서만 사용 (테스트 인코딩으로 확인)
+NVENC_BFRAME_OPTIONS = ("-bf", "3", "-b_ref_mode", "middle")
 
 # --- 고정 설정 변수 ---
 AUDIO_CODEC = "aac"
 AUDIO_BITRATE = "192k" 
 
 INPUT_EXTENSIONS = ['.mov', '.mp4', '.avi', '.mkv'] 
+# 파일 이름 필터를 한 번만 컴파일해 두고 파일마다 lower() 복사본이나 튜플을 만들지 않도록 함 (예: .*\.(?:mov|mp4|avi|mkv)\Z)
+_INPUT_PATTERN = re.compile(
+    r'.*\.(?:' + '|'.join(re.escape(ext[1:]) for ext in INPUT_EXTENSIONS) + r')\Z',
+    re.IGNORECASE | re.DOTALL
+)
 OUTPUT_EXTENSION = '.mp4'
+# 기본 스트림 선택은 오디오 트랙을 하나만 고르므로 비디오(커버 이미지 제외)와 모든 오디오 트랙을 명시적으로 선택
+# (MOV의 타임코드/데이터 트랙은 MP4에 담을 수 없는 경우가 많아 제외, 자막은 subtitle_map_options로 따로 선택)
+STREAM_MAP_OPTIONS = ["-map", "0:V", "-map", "0:a?"]
+# MP4(mov_text)로 변환할 수 있는 텍스트 자막 코덱 (PGS/DVD 같은 비트맵 자막은 변환할 수 없어 제외)
+TEXT_SUBTITLE_CODECS = {"subrip", "ass", "mov_text", "webvtt"}
+REMUX_TAG = "HEVC_COPY" # 이미 HEVC인 영상을 재인코딩 없이 스트림 복사할 때 출력 파일 태그
 FFMPEG_PATH = "ffmpeg" 
 FFPROBE_PATH = "ffprobe"
 
-# FFmpeg 시간 출력 포맷을 파싱하기 위한 정규 표현식 (예: time=00:01:23.45)
-# NVENC 사용 시 time=00:00:00.00 이런 형태의 출력이 한 줄에 이어서 나올 수도 있어 좀 더 견고하게 수정
-TIME_REGEX = re.compile(r'time=(\d{2}):(\d{2}):(\d{2})\.(\d{2})') 
+# --- 병렬 처리 설정 변수 ---
+NVENC_JOBS = 2 # NVENC 엔진 2개를 동시에 사용하기 위한 기본 동시 작업 수
+X265_THREADS_PER_JOB = 4 # CPU 모드에서 작업 하나당 할당할 코어 수 (기본 동시 작업 수 계산용)
+PROBE_JOBS = 8 # 길이 일괄 조회 시 동시에 실행할 최대 ffprobe 프로세스 수
+# 모든 FFmpeg 실행에 공통으로 붙는 옵션 (배너 출력 생략, stdin 입력 대기 비활성화)
+# 입력 분석 옵션은 기본값을 유지: -fflags +nobuffer는 분석 중 읽은 패킷(첫 IDR 프레임 등)을 버리는 라이브 입력용 옵션임
+FFMPEG_STARTUP_OPTIONS = ["-hide_banner", "-nostdin"]
+ERROR_LOG_LINES = 200 # 실패 시 출력하기 위해 보관하는 FFmpeg 에러 로그의 마지막 줄 수
+
+# FFmpeg -progress 출력에서 현재 인코딩 위치(마이크로초)를 나타내는 키 (출력은 디코딩 없이 bytes로 비교)
+PROGRESS_TIME_KEY = b"out_time_us="
+PIPE_READ_SIZE = 65536 # 진행 정보를 한 번에 읽을 크기 (OS 파이프 버퍼 크기)
+
+# --- 짧은 클립 묶음 처리 설정 변수 (--concat_short) ---
+CONCAT_MAX_DURATION = 30.0 # 이 길이(초)보다 짧은 클립만 묶음 대상
+CONCAT_MIN_FILES = 4 # 같은 형식의 클립이 이 개수 이상일 때만 묶어서 처리
+CONCAT_SPLIT_MARGIN = 0.001 # 분할 시각을 다음 클립 시작보다 살짝 앞에 두어 타임스탬프 반올림 오차를 흡수 (초)
+
+def default_jobs(use_gpu: bool) -> int:
+    """인코딩 모드에 맞는 기본 동시 작업 수를 반환합니다."""
+    if use_gpu:
+        return NVENC_JOBS
+    return max(1, (os.cpu_count() or 1) // X265_THREADS_PER_JOB)
+
+def x265_thread_params(jobs: int) -> str:
+    """동시 작업들이 코어를 나눠 쓰도록 libx265 스레드 풀/프레임 스레드 수를 계산합니다."""
+    pools = max(1, (os.cpu_count() or 1) // max(1, jobs))
+    frame_threads = max(1, min(4, pools // 2))
+    return f"pools={pools}:frame-threads={frame_threads}"
 
-def time_to_seconds(t_str: str) -> float:
-    """HH:MM:SS.ms 문자열을 초(seconds) 단위로 변환합니다."""
+@functools.lru_cache(maxsize=None)
+def nvenc_test_encode(*options: str) -> bool:
+    """주어진 추가 옵션으로 hevc_nvenc 1프레임 테스트 인코딩을 해 보고 성공 여부를 캐시합니다.
+
+    배포용 FFmpeg 빌드는 NVIDIA GPU/드라이버가 없어도 -encoders 목록에 hevc_nvenc를 포함하고,
+    GPU 세대에 따라 지원하지 않는 옵션은 인코더 초기화 단계에서 실패하므로 실제로 인코딩해 봅니다.
+    """
     try:
-        # 정규식 캡처 그룹 (HH, MM, SS, ms)을 가정하고 파싱
-        parts = t_str.split(':')
-        if len(parts) == 3:
-             # SS.ms 분리
-             s_ms = parts[2]
-             s, ms_str = s_ms.split('.')
-             
-             h = float(parts[0])
-             m = float(parts[1])
-             s = float(s)
-             ms = float(ms_str)
-             
-             # ms는 1/100초를 나타낸다고 가정
-             return h * 3600 + m * 60 + s + ms / 100.0 
-        return 0.0
-    except:
-        return 0.0
-
-def get_duration(input_path: Path) -> float:
-    """ffprobe를 사용하여 동영상 파일의 총 길이를 초 단위로 얻습니다."""
+        result = subprocess.run(
+            [FFMPEG_PATH, "-hide_banner", "-nostdin", "-loglevel", "error",
+             "-f", "lavfi", "-i", "nullsrc=s=256x256", "-frames:v", "1", "-c:v", "hevc_nvenc", *options,
+             "-f", "null", "-"],
+            capture_output=True
+        )
+    except FileNotFoundError:
+        return False
+    return result.returncode == 0
+
+def nvenc_available() -> bool:
+    """이 PC에서 hevc_nvenc 인코딩이 가능한지 한 번만 확인합니다."""
+    return nvenc_test_encode()
+
+def nvenc_bframes_available() -> bool:
+    """HEVC B-프레임과 B-프레임 참조를 지원하는 GPU인지 한 번만 확인합니다.
+
+    Pascal 이전 GPU는 "Max B-frames exceed" 등으로 인코더 초기화에 실패합니다.
+    """
+    return nvenc_test_encode(*NVENC_BFRAME_OPTIONS)
+
+def nvenc_tune_available(tune: str) -> bool:
+    """NVENC 튜닝을 사용할 수 있는지 한 번만 확인합니다.
+
+    uhq는 Turing 이후 GPU와 FFmpeg 7.0 이상(NVENC SDK 12.2)이 필요해 그 외 환경에서는 실패합니다.
+    """
+    return nvenc_test_encode("-tune", tune)
+
+def encode_tag(use_gpu: bool, crf: int = DEFAULT_CRF_VALUE, cq: int = NVENC_CQP_VALUE) -> str:
+    """재인코딩 시 출력 파일 이름에 붙는 모드/품질 태그를 반환합니다."""
+    if use_gpu:
+        return "NVENC_CQP" + str(cq)
+    return "CRF" + str(crf)
+
+def find_existing_output(input_path: Path, output_dir: Path, tag: str, force_reencode: bool = False) -> Optional[Path]:
+    """입력 파일에 대한 출력 파일(재인코딩 또는 스트림 복사 결과)이 이미 있으면 그 경로를, 없으면 None을 반환합니다.
+
+    ffprobe 없이 stat만으로 확인하므로 이미 변환된 파일은 프로세스를 띄우지 않고 건너뛸 수 있습니다.
+    """
+    tags = [tag]
+    if not force_reencode:
+        tags.append(REMUX_TAG)
+    for tag in tags:
+        output_path = output_dir / f"{input_path.stem}_{tag}{OUTPUT_EXTENSION}"
+        if output_path.exists():
+            return output_path
+    return None
+
+class StreamInfo(NamedTuple):
+    """ffprobe로 조회한 파일 정보입니다.
+
+    조회에 실패하면 duration은 0.0이고, 해당 스트림이 없으면 나머지 값은 None입니다.
+    """
+    duration: float
+    vcodec: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    fps: Optional[str] = None # r_frame_rate (예: "30000/1001")
+    pix_fmt: Optional[str] = None
+    rotation: Optional[int] = None # 화면 회전 각도 (rotate 태그 또는 displaymatrix 기준 시계 방향 0/90/180/270, 없으면 0)
+    acodec: Optional[str] = None # 오디오 트랙 코덱 (코덱이 서로 다른 트랙이 여러 개면 "aac,pcm_s16le"처럼 쉼표로 연결)
+    sample_rate: Optional[str] = None
+    channels: Optional[int] = None
+    audio_tracks: Optional[int] = None # 오디오 트랙 수
+    subtitle_codecs: tuple = () # 자막 트랙 코덱 (트랙 순서대로, 예: ("subrip", "hdmv_pgs_subtitle"))
+
+def ffprobe_stream_command(input_path: Path) -> list:
+    """스트림 정보 조회용 ffprobe 명령어를 구성합니다. 메타데이터만 필요하므로 입력 분석량을 최소화합니다."""
+    return [
+        FFPROBE_PATH,
+        "-v", "error",
+        "-probesize", "32k",
+        "-fflags", "+nobuffer",
+        "-show_entries",
+        "format=duration:stream=codec_type,codec_name,width,height,r_frame_rate,pix_fmt,sample_rate,channels"
+        ":stream_tags=rotate:stream_side_data=rotation",
+        "-of", "json",
+        str(input_path)
+    ]
+
+def parse_rotation(stream: dict) -> int:
+    """ffprobe 스트림 정보에서 화면 회전 각도를 시계 방향 0~359도로 꺼냅니다.
+
+    예전 FFmpeg는 rotate 태그(시계 방향)로, 최신 FFmpeg는 displaymatrix 부가 데이터(반시계 방향)로 알려줍니다.
+    """
+    rotate = stream.get('tags', {}).get('rotate')
+    if rotate is not None:
+        return int(float(rotate)) % 360
+    for side_data in stream.get('side_data_list', []):
+        if 'rotation' in side_data:
+            return -int(float(side_data['rotation'])) % 360
+    return 0
+
+def parse_stream_info(ffprobe_output: str) -> StreamInfo:
+    """ffprobe JSON 출력에서 총 길이(초)와 첫 비디오/오디오 스트림의 정보, 오디오/자막 트랙 코덱을 꺼냅니다."""
+    probe_info = json.loads(ffprobe_output)
+    duration = float(probe_info['format']['duration'])
+    streams = probe_info.get('streams', [])
+    video = next((stream for stream in streams if stream.get('codec_type') == 'video'), {})
+    audio_streams = [stream for stream in streams if stream.get('codec_type') == 'audio']
+    audio = audio_streams[0] if audio_streams else {}
+    # 중복을 제거하되 트랙 순서는 유지 (모든 트랙이 AAC일 때만 "aac")
+    audio_codecs = ",".join(dict.fromkeys(stream.get('codec_name', '') for stream in audio_streams))
+    return StreamInfo(
+        duration,
+        vcodec=video.get('codec_name'),
+        width=video.get('width'),
+        height=video.get('height'),
+        fps=video.get('r_frame_rate'),
+        pix_fmt=video.get('pix_fmt'),
+        rotation=parse_rotation(video) if video else None,
+        acodec=audio_codecs or None,
+        sample_rate=audio.get('sample_rate'),
+        channels=audio.get('channels'),
+        audio_tracks=len(audio_streams),
+        subtitle_codecs=tuple(
+            stream.get('codec_name', '') for stream in streams if stream.get('codec_type') == 'subtitle'
+        ),
+    )
+
+async def probe_stream(input_path: Path, semaphore: asyncio.Semaphore) -> StreamInfo:
+    """ffprobe를 사용하여 동영상 파일의 총 길이(초)와 비디오/오디오 스트림 정보를 얻습니다.
+
+    semaphore로 동시에 실행되는 ffprobe 수를 제한합니다.
+    """
+    async with semaphore:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *ffprobe_stream_command(input_path),
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await process.communicate()
+        except FileNotFoundError as e:
+            tqdm.write(f"    [ERROR] FFprobe 실패: 길이를 가져올 수 없습니다. {e}")
+            return StreamInfo(0.0)
+
     try:
-        command = [
-            FFPROBE_PATH,
-            "-v", "error",
-            "-show_entries", "format=duration",
-            "-of", "json",
-            str(input_path.resolve())
-        ]
-        result = subprocess.run(command, capture_output=True, text=True, check=True)
-        duration_info = json.loads(result.stdout)
-        
-        duration = float(duration_info['format']['duration'])
-        return duration
-    except (subprocess.CalledProcessError, FileNotFoundError, KeyError, ValueError) as e:
-        print(f"    [ERROR] FFprobe 실패: 길이를 가져올 수 없습니다. {e}")
-        return 0.0
-
-def convert_video_file(input_path: Path, output_dir: Path, use_gpu: bool):
-    """단일 파일을 인코딩하고 tqdm으로 진행률을 표시합니다."""
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, FFPROBE_PATH, stdout, stderr)
+        return parse_stream_info(stdout.decode())
+    except (subprocess.CalledProcessError, KeyError, ValueError) as e:
+        tqdm.write(f"    [ERROR] FFprobe 실패: 길이를 가져올 수 없습니다. ({input_path.name}) {e}")
+        return StreamInfo(0.0)
+
+async def probe_streams(input_files: list) -> dict[Path, StreamInfo]:
+    """여러 파일의 스트림 정보를 ffprobe 프로세스를 동시에 띄워 한 번에 조회합니다."""
+    semaphore = asyncio.Semaphore(PROBE_JOBS)
+    stream_infos = await asyncio.gather(*(probe_stream(path, semaphore) for path in input_files))
+    return dict(zip(input_files, stream_infos))
+
+def last_progress_us(block: bytes) -> Optional[int]:
+    """완전한 줄들로 이루어진 -progress 출력 블록에서 마지막 out_time_us 값(마이크로초)을 찾습니다.
+
+    값이 없거나 아직 'N/A'이면 None을 반환합니다.
+    """
+    start = block.rfind(PROGRESS_TIME_KEY)
+    if start == -1:
+        return None
+    start += len(PROGRESS_TIME_KEY)
+    value = block[start:block.index(b"\n", start)].strip()
+    return int(value) if value.isdigit() else None
+
+async def read_tail(stream: asyncio.StreamReader, maxlen: int) -> collections.deque:
+    """스트림을 끝까지 읽으면서 마지막 maxlen줄만 보관합니다.
+
+    줄 단위(readline)로 읽으면 스트림 버퍼 한도(64KiB)보다 긴 줄에서 예외가 나 읽기가 멈추고,
+    파이프가 차면 FFmpeg가 멈추므로 블록 단위로 읽어 직접 줄을 나눕니다.
+    """
+    tail = collections.deque(maxlen=maxlen)
+    pending = b""
+    while True:
+        chunk = await stream.read(PIPE_READ_SIZE)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()[-PIPE_READ_SIZE:] # 끝나지 않은 줄은 다음 청크와 합침 (너무 긴 줄은 뒷부분만 보관)
+        tail.extend(line + b"\n" for line in lines)
+    if pending:
+        tail.append(pending)
+    return tail
+
+async def run_ffmpeg(command: list, total_duration: float, desc: str, position: int = 0) -> tuple:
+    """FFmpeg를 실행하면서 -progress 출력으로 tqdm 진행률을 표시합니다.
+
+    (리턴 코드, stderr 마지막 ERROR_LOG_LINES줄)을 반환합니다.
+    """
+    # 비동기 서브프로세스로 실행하여 한 스레드에서 여러 FFmpeg의 출력을 동시에 읽어들임
+    # 진행 정보는 키 접두어 비교만 하므로 str로 디코딩하지 않고 bytes 그대로 읽음
+    process = await asyncio.create_subprocess_exec(
+        *command, 
+        stdout=asyncio.subprocess.PIPE, # -progress pipe:1 진행 정보
+        stderr=asyncio.subprocess.PIPE # 실패 시 출력할 에러 로그
+    )
+
+    # -loglevel error 이므로 stderr에는 에러 로그만 나옴. 파이프가 차지 않도록 진행 정보와 함께 읽으면서
+    # 진단에 필요한 마지막 부분만 보관
+    error_tail_task = asyncio.create_task(read_tail(process.stderr, ERROR_LOG_LINES))
     
-    # --- 0. 모드에 따른 인코더/품질 설정 ---
+    # tqdm 설정 (total은 총 시간(초))
+    with tqdm(total=total_duration, unit="s", desc=desc, miniters=1,
+              position=position, leave=False) as pbar:
+        # 진행 위치는 FFmpeg가 주는 정수 마이크로초 그대로 비교하고, tqdm에 넘길 때만 초로 변환
+        total_us = int(total_duration * 1_000_000)
+        done_us = 0
+        
+        # 줄마다 읽는 대신 파이프 버퍼 크기만큼 한 번에 읽고, 읽은 블록의 마지막 'out_time_us=' 값만 사용
+        pending = b""
+        while True:
+            chunk = await process.stdout.read(PIPE_READ_SIZE)
+            if not chunk:
+                break
+            
+            # 완전한 줄까지만 처리하고, 잘린 마지막 줄은 다음 청크와 합쳐서 처리
+            data = pending + chunk
+            block_end = data.rfind(b"\n") + 1
+            block, pending = data[:block_end], data[block_end:]
+            
+            current_us = last_progress_us(block)
+            if current_us is None:
+                continue
+            
+            # --- TqdmWarning 해결을 위한 수정 ---
+            # 1. 현재 진행된 시간이 총 시간을 초과하지 않도록 제한(clamp)합니다.
+            clamped_us = min(current_us, total_us)
+            
+            # 2. tqdm 업데이트: 현재 진행 상황(clamped_us)이 이전 값보다 클 때만 업데이트
+            if clamped_us > done_us:
+                pbar.update((clamped_us - done_us) / 1_000_000)
+                done_us = clamped_us
+            # ------------------------------------
+
+    error_tail = await error_tail_task
+
+    # 프로세스가 완료될 때까지 대기하고 리턴 코드 확인
+    await process.wait()
+    return process.returncode, error_tail
+
+def print_ffmpeg_error(name: str, command: list, returncode: int, error_tail: collections.deque):
+    """실패한 FFmpeg 명령어와 에러 로그를 출력합니다."""
+    tqdm.write(f"    [ERROR] 변환 실패: {name} (리턴 코드: {returncode})")
+    # --- 실패 시 에러 로그 출력 ---
+    tqdm.write("    --- FFmpeg Error Log Start (Failed Command) ---")
+    tqdm.write(" ".join(command))
+    tqdm.write("    --- FFmpeg Error Output ---")
+    tqdm.write(b"".join(error_tail).decode(errors="replace"))
+    tqdm.write("    --- FFmpeg Error Log End ---")
+    # -------------------------------
+
+def audio_encode_options(acodec: str) -> list:
+    """원본 오디오가 이미 AAC이면 그대로 복사하고, 아니면 AAC로 인코딩하는 옵션을 반환합니다.
+
+    AAC를 다시 AAC로 인코딩하면 CPU만 쓰고 음질은 세대 손실로 나빠지기만 합니다.
+    """
+    if acodec == "aac":
+        return ["-c:a", "copy"]
+    return ["-c:a", AUDIO_CODEC, "-b:a", AUDIO_BITRATE]
+
+def subtitle_map_options(subtitle_codecs: tuple) -> list:
+    """텍스트 자막 트랙만 골라 MP4용 mov_text로 변환하는 옵션을 반환합니다. 비트맵 자막은 건너뜁니다."""
+    options = []
+    for index, codec in enumerate(subtitle_codecs):
+        if codec in TEXT_SUBTITLE_CODECS:
+            options.extend(["-map", f"0:s:{index}"])
+    if options:
+        options.extend(["-c:s", "mov_text"])
+    return options
+
+def video_encode_options(use_gpu: bool, jobs: int = 1, preset: str = DEFAULT_PRESET,
+                         nvenc_preset: str = NVENC_PRESET, nvenc_tune: str = NVENC_TUNE,
+                         crf: int = DEFAULT_CRF_VALUE, cq: int = NVENC_CQP_VALUE,
+                         nvenc_bframes: bool = False, rotation: Optional[int] = 0) -> tuple:
+    """재인코딩 모드에 맞는 (입력 옵션, 비디오 출력 옵션)을 구성합니다. 입력 옵션은 -i 앞에 와야 합니다.
+
+    nvenc_bframes는 GPU가 HEVC B-프레임을 지원할 때만(nvenc_bframes_available) 켭니다.
+    rotation은 입력 영상의 화면 회전 각도(StreamInfo.rotation)입니다.
+    """
     if use_gpu:
         VIDEO_CODEC = "hevc_nvenc"
-        PRESET = NVENC_PRESET
-        QUALITY_PARAM = ["-cq", str(NVENC_CQP_VALUE)] # CQP
-        TAG = "NVENC_CQP" + str(NVENC_CQP_VALUE)
-        # NVENC 추가 옵션: VBR 모드, HQ 튜닝, 비트레이트 제한 해제
-        EXTRA_OPTIONS = ["-rc", "vbr", "-b:v", "0k", "-qmin", "0", "-qmax", "51"]
-        print(f"    [INFO] GPU (NVENC) 모드: {VIDEO_CODEC}, CQP={NVENC_CQP_VALUE}")
+        PRESET = nvenc_preset
+        QUALITY_PARAM = ["-cq", str(cq)] # CQP
+        # 입력 옵션: CUDA(NVDEC)로 디코딩하고 프레임을 VRAM에 둔 채 NVENC로 넘겨 호스트 왕복 복사를 없앰
+        # 단, 회전된 영상(세로 촬영 폰 영상 등)은 자동 회전(transpose 필터)이 CUDA 프레임을 처리하지 못하므로
+        # 디코딩만 GPU로 하고 프레임은 시스템 메모리로 받아 회전시킴
+        INPUT_OPTIONS = ["-hwaccel", "cuda"]
+        if not rotation:
+            INPUT_OPTIONS.extend(["-hwaccel_output_format", "cuda", "-extra_hw_frames", "8"])
+        # NVENC 추가 옵션: VBR 모드, 비트레이트 제한 해제, 튜닝, 2-pass(1/4 해상도)
+        EXTRA_OPTIONS = [
+            "-rc", "vbr", "-b:v", "0k", "-qmin", "0", "-qmax", "51",
+            "-tune", nvenc_tune, "-multipass", "qres",
+            # NVENC는 CPU 스레드로 병렬화되지 않으므로 스레드 1개만 사용
+            "-threads", "1",
+        ]
+        if nvenc_bframes:
+            EXTRA_OPTIONS.extend(NVENC_BFRAME_OPTIONS)
+        tqdm.write(f"    [INFO] GPU (NVENC) 모드: {VIDEO_CODEC}, CQP={cq}, preset={nvenc_preset}, tune={nvenc_tune}")
     else:
         VIDEO_CODEC = "libx265"
-        PRESET = DEFAULT_PRESET
-        QUALITY_PARAM = ["-crf", str(DEFAULT_CRF_VALUE)] # CRF
-        TAG = "CRF" + str(DEFAULT_CRF_VALUE)
-        EXTRA_OPTIONS = []
-        print(f"    [INFO] CPU (libx265) 모드: {VIDEO_CODEC}, CRF={DEFAULT_CRF_VALUE}")
+        PRESET = preset
+        QUALITY_PARAM = ["-crf", str(crf)] # CRF
+        INPUT_OPTIONS = []
+        # 동시 작업끼리 코어를 과점유하지 않도록 x265 스레드 수를 제한
+        EXTRA_OPTIONS = ["-threads", "0", "-x265-params", x265_thread_params(jobs)]
+        tqdm.write(f"    [INFO] CPU (libx265) 모드: {VIDEO_CODEC}, CRF={crf}, preset={preset}")
+
+    # 비디오 설정: 코덱, 품질 및 프리셋, 추가 옵션, 공통 HEVC 태그
+    video_options = ["-c:v", VIDEO_CODEC]
+    video_options.extend(QUALITY_PARAM)
+    video_options.extend(["-preset", PRESET])
+    video_options.extend(EXTRA_OPTIONS)
+    video_options.extend(["-tag:v", "hvc1"])
+    return INPUT_OPTIONS, video_options
 
+async def convert_video_file(input_path: Path, output_dir: Path, use_gpu: bool, jobs: int = 1, position: int = 0,
+                       stream_info: Optional[StreamInfo] = None, preset: str = DEFAULT_PRESET,
+                       nvenc_preset: str = NVENC_PRESET, nvenc_tune: str = NVENC_TUNE,
+                       force_reencode: bool = False, crf: int = DEFAULT_CRF_VALUE, cq: int = NVENC_CQP_VALUE,
+                       nvenc_bframes: bool = False):
+    """단일 파일을 인코딩하고 tqdm으로 진행률을 표시합니다.
 
-    # 0. 총 길이 가져오기
-    total_duration = get_duration(input_path)
+    jobs는 동시에 실행되는 작업 수(CPU 모드 스레드 분배용), position은 tqdm 표시줄 위치(워커 슬롯)입니다.
+    stream_info를 미리 조회해 넘기면 ffprobe 호출을 생략합니다.
+    preset/crf는 CPU 모드에서만, nvenc_preset/nvenc_tune/cq/nvenc_bframes는 GPU 모드에서만 사용됩니다.
+    입력이 이미 HEVC이면 force_reencode가 아닌 한 재인코딩 없이 스트림 복사(remux)만 합니다.
+    """
+    
+    # 0. 총 길이/코덱 가져오기 (미리 조회된 값이 없을 때만 ffprobe 실행)
+    if stream_info is None:
+        # 이미 변환된 파일이면 ffprobe를 띄우기 전에 건너뜀
+        existing_output = find_existing_output(input_path, output_dir, encode_tag(use_gpu, crf, cq), force_reencode)
+        if existing_output is not None:
+            tqdm.write(f"    [SKIP] 이미 존재함: {existing_output.name}")
+            return
+        stream_info = await probe_stream(input_path, asyncio.Semaphore(1))
+    total_duration = stream_info.duration
     if total_duration == 0.0:
-        print(f"    [SKIP] 길이를 알 수 없어 변환을 건너뜁니다: {input_path.name}")
+        tqdm.write(f"    [SKIP] 길이를 알 수 없어 변환을 건너뜁니다: {input_path.name}")
         return
 
+    remux = stream_info.vcodec == "hevc" and not force_reencode
+
+    # --- 모드에 따른 인코더/품질 설정 ---
+    if remux:
+        TAG = REMUX_TAG
+        tqdm.write(f"    [INFO] 이미 HEVC 영상이므로 재인코딩 없이 스트림 복사: {input_path.name}")
+    else:
+        TAG = encode_tag(use_gpu, crf, cq)
+        INPUT_OPTIONS, VIDEO_OPTIONS = video_encode_options(use_gpu, jobs, preset, nvenc_preset, nvenc_tune, crf, cq,
+                                                            nvenc_bframes, stream_info.rotation)
+
     # 1. 출력 파일 이름 정의 및 경로 확인
     output_filename = f"{input_path.stem}_{TAG}{OUTPUT_EXTENSION}"
     output_path = output_dir / output_filename
@@ -98,123 +441,304 @@ def convert_video_file(input_path: Path, output_dir: Path, use_gpu: bool):
     output_dir.mkdir(parents=True, exist_ok=True)
     
     if output_path.exists():
-        print(f"    [SKIP] 이미 존재함: {output_path.name}")
+        tqdm.write(f"    [SKIP] 이미 존재함: {output_path.name}")
         return
 
-    print(f"    [START] 변환 시작: {input_path.name}")
+    tqdm.write(f"    [START] 변환 시작: {input_path.name}")
+    skipped_subtitles = [codec for codec in stream_info.subtitle_codecs if codec not in TEXT_SUBTITLE_CODECS]
+    if skipped_subtitles:
+        tqdm.write(f"    [INFO] MP4에 담을 수 없는 비트맵 자막 {len(skipped_subtitles)}개는 제외합니다: {', '.join(skipped_subtitles)}")
     
     # 2. FFmpeg 명령어 구성
-    command = [
-        FFMPEG_PATH, 
-        
-        # 입력 파일 설정
-        "-i", str(input_path),
+    if remux:
+        # 비디오는 디코딩/인코딩 없이 그대로 복사하고 HEVC 태그와 메타데이터만 맞춤
+        # 오디오는 AAC일 때만 복사 (PCM 등 MP4에 담을 수 없는 코덱은 복사하면 실패하므로 AAC로 인코딩)
+        command = [
+            FFMPEG_PATH,
+            *FFMPEG_STARTUP_OPTIONS,
+            "-i", str(input_path),
+            *STREAM_MAP_OPTIONS,
+            *subtitle_map_options(stream_info.subtitle_codecs),
+            "-c:v", "copy",
+            "-tag:v", "hvc1",
+            "-map_metadata", "0",
+        ]
+        command.extend(audio_encode_options(stream_info.acodec))
+    else:
+        command = [FFMPEG_PATH, *FFMPEG_STARTUP_OPTIONS]
         
-        # 메타데이터 복사 옵션
-        "-map_metadata", "0", 
+        # 입력 파일 설정 (디코딩 옵션은 -i 앞에 와야 함)
+        command.extend(INPUT_OPTIONS)
+        command.extend([
+            "-i", str(input_path),
+            
+            # 스트림 선택: 비디오와 모든 오디오 트랙, 텍스트 자막 (자막은 mov_text로 변환)
+            *STREAM_MAP_OPTIONS,
+            *subtitle_map_options(stream_info.subtitle_codecs),
+            
+            # 메타데이터 복사 옵션
+            "-map_metadata", "0", 
+        ])
         
         # 비디오 설정
-        "-c:v", VIDEO_CODEC,
-    ]
-    
-    # 품질 및 프리셋, 추가 옵션 통합
-    command.extend(QUALITY_PARAM)
-    command.extend(["-preset", PRESET])
-    command.extend(EXTRA_OPTIONS)
-    
-    # 공통 HEVC 태그
-    command.extend(["-tag:v", "hvc1"])
-    
-    # 오디오 설정
-    command.extend([
-        "-c:a", AUDIO_CODEC,
-        "-b:a", AUDIO_BITRATE,
-    ])
+        command.extend(VIDEO_OPTIONS)
+        
+        # 오디오 설정 (이미 AAC이면 복사)
+        command.extend(audio_encode_options(stream_info.acodec))
     
-    # FFmpeg 진행 정보 출력 설정
-    command.append("-stats") 
+    # FFmpeg 진행 정보 출력 설정: 사람이 읽는 -stats 대신 key=value 형식의 진행 정보를 stdout으로 받고,
+    # stderr에는 에러 로그만 남김
+    command.extend(["-progress", "pipe:1", "-nostats", "-loglevel", "error"])
     
     # 출력 파일 설정
     command.append(str(output_path))
     
     # 3. FFmpeg 실행 및 tqdm 연동
     try:
-        # Popen을 사용하여 출력을 스트림으로 읽어들임
-        process = subprocess.Popen(
-            command, 
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE, # FFmpeg 진행률은 stderr로 출력됨
-            text=True,
-            bufsize=1
-        )
-        
-        # tqdm 설정 (total은 총 시간(초))
-        with tqdm(total=total_duration, unit="s", desc=f"  {output_filename}", miniters=1) as pbar:
-            full_stderr = "" # 에러 로그 저장용 변수
-            while True:
-                # stderr에서 한 줄씩 읽기
-                line = process.stderr.readline()
-                if not line:
-                    break
-                
-                full_stderr += line
-                
-                # 'time=' 패턴 찾기
-                match = re.search(TIME_REGEX, line)
-                
-                if match:
-                    # 'time=HH:MM:SS.ms' 형태의 문자열 추출
-                    current_seconds = time_to_seconds(f"{match.group(1)}:{match.group(2)}:{match.group(3)}.{match.group(4)}")
-                    
-                    # --- TqdmWarning 해결을 위한 수정 ---
-                    # 1. 현재 진행된 시간이 총 시간을 초과하지 않도록 제한(clamp)합니다.
-                    clamped_seconds = min(current_seconds, total_duration)
-                    
-                    # 2. tqdm 업데이트: 현재 진행 상황(clamped_seconds)이 pbar.n보다 클 때만 업데이트
-                    if clamped_seconds > pbar.n:
-                        pbar.update(clamped_seconds - pbar.n)
-                    # ------------------------------------
-
-        # Popen이 완료될 때까지 대기하고 리턴 코드 확인
-        process.wait()
-
-        if process.returncode == 0:
-            print(f"    [SUCCESS] 변환 완료: {output_path.name}")
+        returncode, error_tail = await run_ffmpeg(command, total_duration, f"  {output_filename}", position)
+
+        if returncode == 0:
+            tqdm.write(f"    [SUCCESS] 변환 완료: {output_path.name}")
         else:
-            print(f"    [ERROR] 변환 실패: {input_path.name} (리턴 코드: {process.returncode})")
-            # --- 실패 시 에러 로그 출력 ---
-            print("    --- FFmpeg Error Log Start (Failed Command) ---")
-            print(" ".join(command))
-            print("    --- FFmpeg Error Output ---")
-            # 전체 에러 출력에서 마지막 몇 줄만 보여주는 것이 유용할 수 있지만, 
-            # 디버깅을 위해 전체 로그를 출력합니다.
-            print(full_stderr)
-            print("    --- FFmpeg Error Log End ---")
-            # -------------------------------
+            print_ffmpeg_error(input_path.name, command, returncode, error_tail)
             
     except FileNotFoundError:
-        print(f"    [FATAL ERROR] FFmpeg 또는 FFprobe 실행 파일을 찾을 수 없습니다. 경로를 확인하세요: {FFMPEG_PATH}")
+        tqdm.write(f"    [FATAL ERROR] FFmpeg 또는 FFprobe 실행 파일을 찾을 수 없습니다. 경로를 확인하세요: {FFMPEG_PATH}")
         return
     except Exception as e:
-        print(f"    [ERROR] 예상치 못한 오류: {e}")
-        
-def process_directory(input_dir: Path, output_dir: Path, use_gpu: bool):
-    """주어진 입력 디렉토리를 순회하며 파일을 찾아 지정된 출력 디렉토리에 저장합니다."""
+        tqdm.write(f"    [ERROR] 예상치 못한 오류: {e}")
+
+def concat_group_key(stream_info: StreamInfo) -> tuple:
+    """concat으로 이어 붙일 수 있는 클립끼리 같은 값을 갖는 키 (해상도, 회전, 프레임레이트, 픽셀 포맷, 코덱, 오디오 형식).
+
+    concat 입력은 첫 파일의 스트림 정보와 회전 정보를 그대로 쓰므로, 해상도가 같아도 세로/가로 영상은 따로 묶습니다.
+    """
+    return (
+        stream_info.width, stream_info.height, stream_info.rotation, stream_info.fps, stream_info.pix_fmt,
+        stream_info.vcodec, stream_info.acodec, stream_info.sample_rate, stream_info.channels,
+        stream_info.audio_tracks,
+    )
+
+def group_short_clips(input_files: list, stream_infos: dict, force_reencode: bool = False) -> tuple:
+    """CONCAT_MAX_DURATION보다 짧고 concat_group_key가 같은 클립을 묶습니다.
+
+    (CONCAT_MIN_FILES개 이상인 묶음 목록, 개별로 변환할 파일 목록)을 반환합니다.
+    스트림 복사 대상(HEVC)이나 정보가 부족한 파일, 묶음 출력에는 첫 오디오 트랙만 담기고 자막은 담기지 않으므로
+    오디오 트랙이 여러 개이거나 자막이 있는 파일은 묶지 않습니다 (파일별 변환은 모든 트랙을 유지).
+    """
+    candidates = {}
+    for input_path in input_files:
+        stream_info = stream_infos[input_path]
+        key = concat_group_key(stream_info)
+        remux = stream_info.vcodec == "hevc" and not force_reencode
+        if (0.0 < stream_info.duration < CONCAT_MAX_DURATION and not remux and None not in key
+                and stream_info.audio_tracks == 1 and not stream_info.subtitle_codecs):
+            candidates.setdefault(key, []).append(input_path)
+
+    clip_groups = [paths for paths in candidates.values() if len(paths) >= CONCAT_MIN_FILES]
+    grouped = {input_path for paths in clip_groups for input_path in paths}
+    return clip_groups, [input_path for input_path in input_files if input_path not in grouped]
+
+async def convert_clip_group(input_paths: list, stream_infos: dict, output_dir: Path, use_gpu: bool,
+                             jobs: int = 1, position: int = 0, preset: str = DEFAULT_PRESET,
+                             nvenc_preset: str = NVENC_PRESET, nvenc_tune: str = NVENC_TUNE,
+                             crf: int = DEFAULT_CRF_VALUE, cq: int = NVENC_CQP_VALUE,
+                             nvenc_bframes: bool = False):
+    """짧은 클립 묶음을 concat 입력으로 이어 FFmpeg 한 번에 인코딩하고, segment 먹서로 다시 파일별로 나눕니다.
+
+    파일마다 FFmpeg/인코더 초기화를 반복하지 않기 위한 경로이며, 실패하면 파일별 변환으로 되돌아갑니다.
+    concat 입력에는 파일별 컨테이너 메타데이터(촬영 시각 등)가 전달되지 않으므로 출력에도 남지 않습니다.
+    """
+    TAG = encode_tag(use_gpu, crf, cq)
+    # 묶음 안의 클립은 회전 각도가 모두 같음 (concat_group_key)
+    INPUT_OPTIONS, VIDEO_OPTIONS = video_encode_options(use_gpu, jobs, preset, nvenc_preset, nvenc_tune, crf, cq,
+                                                        nvenc_bframes, stream_infos[input_paths[0]].rotation)
+
+    # 각 클립은 앞 클립 길이의 누적 시각에서 시작하므로, 그 직전에서 키프레임을 강제하고 잘라냄
+    durations = [stream_infos[input_path].duration for input_path in input_paths]
+    total_duration = sum(durations)
+    split_times = ",".join(
+        f"{start - CONCAT_SPLIT_MARGIN:.6f}" for start in itertools.accumulate(durations[:-1])
+    )
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    work_dir = Path(tempfile.mkdtemp(prefix=".concat_", dir=output_dir))
+    tqdm.write(f"    [START] 묶음 변환 시작: {len(input_paths)}개 클립 ({input_paths[0].name} 외)")
+
+    converted = False
+    try:
+        # 1. concat 목록 작성 (duration 지시어로 각 클립의 시작 시각을 split_times와 정확히 맞춤)
+        concat_list = work_dir / "concat.txt"
+        with open(concat_list, "w", encoding="utf-8") as f:
+            for input_path, duration in zip(input_paths, durations):
+                escaped_path = str(input_path).replace("'", "'\\''")
+                f.write(f"file '{escaped_path}'\nduration {duration:.6f}\n")
+
+        # 2. FFmpeg 명령어 구성
+        segment_list = work_dir / "segments.csv"
+        command = [FFMPEG_PATH, *FFMPEG_STARTUP_OPTIONS]
+        command.extend(INPUT_OPTIONS)
+        command.extend(["-f", "concat", "-safe", "0", "-i", str(concat_list)])
+        command.extend(VIDEO_OPTIONS)
+        command.extend(["-c:a", AUDIO_CODEC, "-b:a", AUDIO_BITRATE])
+        # 분할 지점마다 IDR 프레임을 강제해야 각 조각이 독립적으로 재생됨
+        command.extend(["-force_key_frames", split_times, "-forced-idr", "1"])
+        command.extend([
+            "-f", "segment",
+            "-segment_times", split_times,
+            "-segment_format", "mp4",
+            "-reset_timestamps", "1",
+            "-segment_list", str(segment_list),
+            "-segment_list_type", "csv",
+        ])
+        command.extend(["-progress", "pipe:1", "-nostats", "-loglevel", "error"])
+        command.append(str(work_dir / f"out_%03d{OUTPUT_EXTENSION}"))
+
+        # 3. FFmpeg 실행 후 조각을 원래 파일 이름으로 옮김
+        returncode, error_tail = await run_ffmpeg(
+            command, total_duration, f"  묶음 {len(input_paths)}개 ({input_paths[0].name} 외)", position
+        )
+        if returncode != 0:
+            print_ffmpeg_error(f"{len(input_paths)}개 클립 묶음", command, returncode, error_tail)
+        else:
+            with open(segment_list, newline="", encoding="utf-8") as f:
+                segments = [row[0] for row in csv.reader(f) if row]
+            if len(segments) != len(input_paths):
+                tqdm.write(f"    [WARN] 분할된 조각 수({len(segments)})가 클립 수({len(input_paths)})와 다릅니다.")
+            else:
+                for input_path, segment in zip(input_paths, segments):
+                    output_path = output_dir / f"{input_path.stem}_{TAG}{OUTPUT_EXTENSION}"
+                    if output_path.exists():
+                        tqdm.write(f"    [SKIP] 이미 존재함: {output_path.name}")
+                        continue
+                    os.replace(work_dir / segment, output_path)
+                    tqdm.write(f"    [SUCCESS] 변환 완료: {output_path.name}")
+                converted = True
+
+    except FileNotFoundError:
+        tqdm.write(f"    [FATAL ERROR] FFmpeg 또는 FFprobe 실행 파일을 찾을 수 없습니다. 경로를 확인하세요: {FFMPEG_PATH}")
+        return
+    except Exception as e:
+        tqdm.write(f"    [ERROR] 예상치 못한 오류: {e}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if not converted:
+        tqdm.write(f"    [INFO] 묶음 변환에 실패하여 파일별로 변환합니다: {len(input_paths)}개 클립")
+        for input_path in input_paths:
+            # 묶음에는 스트림 복사 대상이 없으므로 항상 재인코딩
+            await convert_video_file(input_path, output_dir, use_gpu, jobs, position,
+                                     stream_info=stream_infos[input_path], preset=preset,
+                                     nvenc_preset=nvenc_preset, nvenc_tune=nvenc_tune,
+                                     force_reencode=True, crf=crf, cq=cq, nvenc_bframes=nvenc_bframes)
+
+def find_input_files(root) -> list:
+    """root 아래(하위 폴더 포함)에서 INPUT_EXTENSIONS에 해당하는 파일 경로를 모읍니다.
+
+    os.walk 대신 os.scandir의 DirEntry 캐시된 타입 정보를 사용해 파일마다 stat을 다시 호출하지 않습니다.
+    """
+    input_files = []
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        # os.walk와 마찬가지로 열 수 없는 폴더는 건너뜀
+        return input_files
+
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            input_files.extend(find_input_files(entry.path))
+        elif entry.is_file() and _INPUT_PATTERN.match(entry.name):
+            input_files.append(Path(entry.path))
+    return input_files
+
+async def process_directory(input_dir: Path, output_dir: Path, use_gpu: bool, jobs: Optional[int] = None,
+                      preset: str = DEFAULT_PRESET, nvenc_preset: str = NVENC_PRESET, nvenc_tune: str = NVENC_TUNE,
+                      force_reencode: bool = False, crf: int = DEFAULT_CRF_VALUE, cq: int = NVENC_CQP_VALUE,
+                      concat_short: bool = False):
+    """주어진 입력 디렉토리를 순회하며 파일을 찾아 지정된 출력 디렉토리에 저장합니다.
+
+    jobs를 지정하지 않으면 인코딩 모드에 맞는 기본 동시 작업 수(default_jobs)를 사용합니다.
+    concat_short이면 같은 형식의 짧은 클립들을 묶어 FFmpeg 한 번으로 변환합니다(convert_clip_group).
+    """
     
     if not input_dir.is_dir():
         print(f"[FATAL ERROR] 지정된 입력 경로가 유효한 디렉토리가 아닙니다: {input_dir}")
         return
 
-    print(f"--- 폴더 검색 시작: {input_dir.resolve()} ---")
+    if use_gpu and not nvenc_available():
+        print("[WARN] hevc_nvenc 테스트 인코딩에 실패하여 (GPU/드라이버 또는 FFmpeg 빌드 확인) CPU (libx265) 모드로 전환합니다.")
+        use_gpu = False
+
+    # GPU 세대/FFmpeg 버전에 따라 지원하지 않는 옵션은 모든 파일을 실패시키므로 미리 한 번씩 확인
+    nvenc_bframes = use_gpu and nvenc_bframes_available()
+    if use_gpu and not nvenc_bframes:
+        print("[INFO] 이 GPU는 HEVC B-프레임을 지원하지 않아 B-프레임 없이 인코딩합니다.")
+    if use_gpu and nvenc_tune != NVENC_TUNE and not nvenc_tune_available(nvenc_tune):
+        # uhq는 Turing 이후 GPU와 FFmpeg 7.0 이상이 필요함
+        print(f"[WARN] NVENC 튜닝 '{nvenc_tune}'을(를) 사용할 수 없어 '{NVENC_TUNE}'(으)로 전환합니다.")
+        nvenc_tune = NVENC_TUNE
+
+    # 입력 폴더만 한 번 절대 경로로 바꿔 두면 scandir가 돌려주는 파일 경로도 절대 경로가 되므로
+    # 파일마다 resolve()(readlink 등 시스템 콜)를 다시 호출할 필요가 없음
+    input_dir = input_dir.resolve()
+    print(f"--- 폴더 검색 시작: {input_dir} ---")
     print(f"--- 출력 폴더 지정: {output_dir.resolve()} ---")
     print(f"--- 인코딩 모드: {'GPU (NVENC)' if use_gpu else 'CPU (libx265)'} ---")
+
+    if jobs is None:
+        jobs = default_jobs(use_gpu)
+    jobs = max(1, jobs)
+    print(f"--- 동시 작업 수: {jobs} ---")
     
-    for root, _, files in os.walk(input_dir):
-        
-        for filename in files:
-            if filename.lower().endswith(tuple(INPUT_EXTENSIONS)):
-                input_path = Path(root) / filename
-                
-                convert_video_file(input_path, output_dir, use_gpu)
+    # 1. 변환할 파일 목록을 먼저 수집
+    input_files = []
+    for input_path in find_input_files(input_dir):
+        # 이미 변환된 파일은 ffprobe 조회 전에 stat만으로 건너뜀
+        existing_output = find_existing_output(input_path, output_dir, encode_tag(use_gpu, crf, cq), force_reencode)
+        if existing_output is not None:
+            print(f"    [SKIP] 이미 존재함: {existing_output.name}")
+            continue
+        input_files.append(input_path)
+
+    # 2. 모든 파일의 길이/코덱을 인코딩 전에 일괄 조회
+    print(f"--- 길이 확인 중: {len(input_files)}개 파일 ---")
+    stream_infos = await probe_streams(input_files)
+
+    # 3. 같은 형식의 짧은 클립은 묶어서 FFmpeg 한 번으로 처리 (옵션)
+    clip_groups = []
+    if concat_short:
+        clip_groups, input_files = group_short_clips(input_files, stream_infos, force_reencode)
+        if clip_groups:
+            print(f"--- 짧은 클립 묶음: {len(clip_groups)}개 ({sum(len(paths) for paths in clip_groups)}개 파일) ---")
+
+    # 4. 워커 슬롯 번호를 tqdm 위치로 사용하여 진행률 표시줄이 겹치지 않도록 함
+    #    빈 슬롯이 있을 때만 작업을 시작하므로 슬롯 큐가 동시 작업 수 제한(세마포어) 역할도 함
+    #    모든 표시줄은 이벤트 루프 스레드 하나에서만 그려지고, 작업 로그는 tqdm.write로 표시줄 위에 출력되므로
+    #    별도 잠금 없이도 화면이 깨지지 않음
+    slots = asyncio.Queue()
+    for slot in range(jobs):
+        slots.put_nowait(slot)
+
+    async def run_with_slot(convert, *args, **kwargs):
+        slot = await slots.get()
+        try:
+            await convert(*args, position=slot, **kwargs)
+        finally:
+            slots.put_nowait(slot)
+
+    encode_options = dict(preset=preset, nvenc_preset=nvenc_preset, nvenc_tune=nvenc_tune, crf=crf, cq=cq,
+                          nvenc_bframes=nvenc_bframes)
+    tasks = [
+        run_with_slot(convert_clip_group, paths, stream_infos, output_dir, use_gpu, jobs, **encode_options)
+        for paths in clip_groups
+    ]
+    tasks.extend(
+        run_with_slot(convert_video_file, input_path, output_dir, use_gpu, jobs,
+                      stream_info=stream_infos[input_path], force_reencode=force_reencode, **encode_options)
+        for input_path in input_files
+    )
+
+    # 5. 하나의 이벤트 루프에서 여러 FFmpeg 프로세스를 동시에 실행
+    await asyncio.gather(*tasks)
     
     print("--- 모든 파일 처리 완료 ---")
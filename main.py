@@ -1,6 +1,7 @@
 import argparse
+import asyncio
 from pathlib import Path
-from encoder import process_directory
+from encoder import process_directory, DEFAULT_CRF_VALUE, NVENC_CQP_VALUE, DEFAULT_PRESET, X265_PRESETS, NVENC_PRESET, NVENC_PRESETS, NVENC_TUNE, NVENC_TUNES
 
 def main():
     """
@@ -27,7 +28,62 @@ def main():
     parser.add_argument(
         '--gpu', 
         action='store_true', 
-        help="NVIDIA NVENC (hevc_nvenc) GPU 가속 인코딩을 사용합니다. (CRF 대신 CQP 23 사용)"
+        help=f"NVIDIA NVENC (hevc_nvenc) GPU 가속 인코딩을 사용합니다. (CRF 대신 CQP {NVENC_CQP_VALUE} 사용)"
+    )
+    
+    parser.add_argument(
+        '--crf', 
+        type=int, 
+        default=DEFAULT_CRF_VALUE,
+        help=f"libx265 CRF 값입니다. 낮을수록 화질이 높고 용량이 커집니다. (CPU 모드 전용, 기본값: {DEFAULT_CRF_VALUE})"
+    )
+    
+    parser.add_argument(
+        '--cq', 
+        type=int, 
+        default=NVENC_CQP_VALUE,
+        help=f"NVENC CQ 값입니다. 낮을수록 화질이 높고 용량이 커집니다. (GPU 모드 전용, 기본값: {NVENC_CQP_VALUE})"
+    )
+    
+    parser.add_argument(
+        '--jobs', 
+        type=int, 
+        default=None,
+        help="동시에 실행할 인코딩 작업 수입니다. 지정하지 않으면 GPU 모드는 2, CPU 모드는 (CPU 코어 수 // 4)를 사용합니다."
+    )
+    
+    parser.add_argument(
+        '--preset', 
+        choices=X265_PRESETS, 
+        default=DEFAULT_PRESET,
+        help=f"libx265 프리셋입니다. 느릴수록 같은 화질에서 용량이 줄어듭니다. (CPU 모드 전용, 기본값: {DEFAULT_PRESET})"
+    )
+    
+    parser.add_argument(
+        '--nvenc_preset', 
+        choices=NVENC_PRESETS, 
+        default=NVENC_PRESET,
+        help=f"NVENC 프리셋입니다. p1이 가장 빠르고 p7이 가장 높은 품질입니다. (GPU 모드 전용, 기본값: {NVENC_PRESET})"
+    )
+    
+    parser.add_argument(
+        '--nvenc_tune', 
+        choices=NVENC_TUNES, 
+        default=NVENC_TUNE,
+        help=f"NVENC 튜닝입니다. uhq는 Turing 이후 GPU와 FFmpeg 7.0 이상이 필요하며, 사용할 수 없으면 hq로 전환합니다. (GPU 모드 전용, 기본값: {NVENC_TUNE})"
+    )
+    
+    parser.add_argument(
+        '--force_reencode', 
+        action='store_true', 
+        help="입력이 이미 H.265(HEVC)여도 스트림 복사 대신 다시 인코딩합니다."
+    )
+    
+    parser.add_argument(
+        '--concat_short', 
+        action='store_true', 
+        help="해상도/회전/프레임레이트/코덱이 같고 오디오 트랙이 하나이며 자막이 없는 30초 미만 클립이 4개 이상이면 이어 붙여 FFmpeg 한 번으로 인코딩한 뒤 다시 파일별로 나눕니다. "
+             "파일마다 FFmpeg를 새로 띄우는 비용이 줄지만, 파일별 촬영 시각 등 컨테이너 메타데이터는 보존되지 않습니다."
     )
     
     args = parser.parse_args()
@@ -41,7 +97,12 @@ def main():
         output_directory = input_directory.parent / f"{input_directory.name}_encoded"
         print(f"[INFO] 출력 경로가 지정되지 않아 '{output_directory}' 폴더로 자동 설정됩니다.")
     
-    process_directory(input_directory, output_directory, use_gpu_mode)
+    asyncio.run(process_directory(
+        input_directory, output_directory, use_gpu_mode, args.jobs, preset=args.preset,
+        nvenc_preset=args.nvenc_preset, nvenc_tune=args.nvenc_tune,
+        force_reencode=args.force_reencode, crf=args.crf, cq=args.cq,
+        concat_short=args.concat_short
+    ))
 
 if __name__ == "__main__":
     main()